@@ -0,0 +1,37 @@
+"""game rounds
+
+Revision ID: 4e8a2d7f1c6b
+Revises: 9b3f6c1d8e4a
+Create Date: 2026-10-18 21:47:31.208563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4e8a2d7f1c6b"
+down_revision = "9b3f6c1d8e4a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "game_rounds",
+        sa.Column(
+            "chat_id", sa.BigInteger(), autoincrement=False, nullable=False
+        ),
+        sa.Column("data", sa.Text(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("chat_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("game_rounds")
@@ -0,0 +1,91 @@
+"""current game indexes
+
+Revision ID: 5a7c2e91d4f3
+Revises: bc46f3ae9ac9
+Create Date: 2026-10-18 13:40:12.318204
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5a7c2e91d4f3"
+down_revision = "bc46f3ae9ac9"
+branch_labels = None
+depends_on = None
+
+
+DUPLICATES_MESSAGE = """\
+unique indexes can't be built, the database has duplicates left by old
+create/join races: {games} chats with several unfinished games,
+{scores} repeated (game_id, player_id) rows in gamescores.
+Resolve them before upgrading, e.g. keep the newest unfinished game per
+chat and the first score row per player (back up first, not reversible):
+    update games set status='FINISHED'
+    where status <> 'FINISHED' and id not in (
+        select max(id) from games where status <> 'FINISHED'
+        group by chat_id);
+    delete from gamescores where id not in (
+        select min(id) from gamescores group by game_id, player_id);
+"""
+
+
+def check_duplicates() -> None:
+    """
+    this revision only adds indexes, data is never changed here
+    """
+    if context.is_offline_mode():  # --sql, nothing to check against
+        return None
+    connection = op.get_bind()
+    games = connection.execute(
+        sa.text(
+            "select count(*) from (select chat_id from games "
+            "where status <> 'FINISHED' group by chat_id "
+            "having count(*) > 1) as duplicates"
+        )
+    ).scalar()
+    scores = connection.execute(
+        sa.text(
+            "select count(*) from (select game_id, player_id from gamescores "
+            "group by game_id, player_id having count(*) > 1) as duplicates"
+        )
+    ).scalar()
+    if games or scores:
+        raise RuntimeError(
+            DUPLICATES_MESSAGE.format(games=games, scores=scores)
+        )
+
+
+def upgrade() -> None:
+    check_duplicates()
+
+    op.create_index(
+        "uq_games_chat_id_active",
+        "games",
+        ["chat_id"],
+        unique=True,
+        postgresql_where=sa.text("status <> 'FINISHED'"),
+    )
+    op.create_index("ix_games_chat_id_id", "games", ["chat_id", "id"])
+    op.create_unique_constraint(
+        "uq_gamescores_game_id_player_id",
+        "gamescores",
+        ["game_id", "player_id"],
+    )
+    op.create_index(
+        "ix_gamescores_game_id_status_round",
+        "gamescores",
+        ["game_id", "player_status", "game_round"],
+    )
+    op.create_index("ix_gamescores_player_id", "gamescores", ["player_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_gamescores_player_id", table_name="gamescores")
+    op.drop_index("ix_gamescores_game_id_status_round", table_name="gamescores")
+    op.drop_constraint(
+        "uq_gamescores_game_id_player_id", "gamescores", type_="unique"
+    )
+    op.drop_index("ix_games_chat_id_id", table_name="games")
+    op.drop_index("uq_games_chat_id_active", table_name="games")
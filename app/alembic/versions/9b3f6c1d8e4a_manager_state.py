@@ -0,0 +1,53 @@
+"""manager state
+
+Revision ID: 9b3f6c1d8e4a
+Revises: 7d1e4b0c9a2f
+Create Date: 2026-10-18 18:22:09.534871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b3f6c1d8e4a"
+down_revision = "7d1e4b0c9a2f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "votings",
+        sa.Column(
+            "chat_id", sa.BigInteger(), autoincrement=False, nullable=False
+        ),
+        sa.Column("counter", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("chat_id"),
+    )
+    op.create_table(
+        "voting_voters",
+        sa.Column("chat_id", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "user_id", sa.BigInteger(), autoincrement=False, nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["chat_id"], ["votings.chat_id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("chat_id", "user_id"),
+    )
+    op.create_table(
+        "last_inlines",
+        sa.Column(
+            "chat_id", sa.BigInteger(), autoincrement=False, nullable=False
+        ),
+        sa.Column("message_id", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("chat_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("last_inlines")
+    op.drop_table("voting_voters")
+    op.drop_table("votings")
@@ -1,5 +1,9 @@
 import typing
+from contextlib import asynccontextmanager
 from logging import getLogger
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 if typing.TYPE_CHECKING:
     from web.app import Application
@@ -17,3 +21,18 @@ class BaseAccessor:
 
     async def disconnect(self, app: "Application"):
         return
+
+    @asynccontextmanager
+    async def transaction(
+        self, session: Optional[AsyncSession] = None
+    ) -> typing.AsyncIterator[AsyncSession]:
+        """
+        unit of work: join the caller's session if given, so one logical
+        operation uses one connection and one commit, else open own
+        transaction, committed on exit
+        """
+        if session is not None:
+            yield session
+        else:
+            async with self.app.database.session.begin() as session:
+                yield session
@@ -10,7 +10,11 @@ from sqlalchemy import (
     String,
     DateTime,
     Enum,
+    Text,
     BigInteger,
+    Index,
+    UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -40,6 +44,20 @@ class GameResult:
     players: list[Player]
 
 
+@dataclass
+class ChatSnapshot:
+    game_id: Optional[int]
+    status: Optional[str]
+    min_round: Optional[int]
+    active_players: list[Player]
+
+
+@dataclass
+class StateChanges:
+    version: int
+    chat_ids: list[int]
+
+
 class GameModel(db):
     __tablename__ = "games"
     id = Column(Integer, primary_key=True, autoincrement="auto")
@@ -50,6 +68,17 @@ class GameModel(db):
     )
     status = Column(Enum("CREATED", "STARTED", "FINISHED", name="status"))
 
+    __table_args__ = (
+        # only one unfinished game per chat, also serves get_current_game
+        Index(
+            "uq_games_chat_id_active",
+            "chat_id",
+            unique=True,
+            postgresql_where=text("status <> 'FINISHED'"),
+        ),
+        Index("ix_games_chat_id_id", "chat_id", "id"),
+    )
+
 
 class GameScoreModel(db):
     __tablename__ = "gamescores"
@@ -58,3 +87,72 @@ class GameScoreModel(db):
     player_id = Column(BigInteger, ForeignKey("players.id", ondelete="CASCADE"))
     player_status = Column(Integer, default=1)
     game_round = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "game_id", "player_id", name="uq_gamescores_game_id_player_id"
+        ),
+        # active players and min round of a game
+        Index(
+            "ix_gamescores_game_id_status_round",
+            "game_id",
+            "player_status",
+            "game_round",
+        ),
+        Index("ix_gamescores_player_id", "player_id"),
+    )
+
+
+class StateChangeModel(db):
+    """
+    journal of game state changes made outside the manager (admin API),
+    id is the version manager's cache has seen
+    """
+
+    __tablename__ = "state_changes"
+    id = Column(Integer, primary_key=True, autoincrement="auto")
+    created_at = Column(DateTime, server_default=func.now(), nullable=True)
+    chat_id = Column(BigInteger, nullable=False)
+
+
+class VotingModel(db):
+    """
+    manager state: running voting of a chat, counter < 0 - player 1 leads
+    """
+
+    __tablename__ = "votings"
+    chat_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    counter = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class VotingVoterModel(db):
+    __tablename__ = "voting_voters"
+    chat_id = Column(
+        BigInteger,
+        ForeignKey("votings.chat_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+
+
+class LastInlineModel(db):
+    """
+    manager state: last message with inline keyboard in a chat
+    """
+
+    __tablename__ = "last_inlines"
+    chat_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    message_id = Column(BigInteger, nullable=False)
+
+
+class GameRoundModel(db):
+    """
+    manager state: running round of a chat - pairs, results, next phase
+    and its deadline as json, resumed after manager restart
+    """
+
+    __tablename__ = "game_rounds"
+    chat_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -10,10 +10,13 @@ from game.views import (
     GetCurrentGame,
     GetCurrentGameStatus,
     GetCurrentGameState,
+    GetChatSnapshot,
     StartGame,
     GetLastGame,
     FinishGame,
     SetWinnerAndLoser,
+    SetRoundResults,
+    GetStateChanges,
 )
 
 if typing.TYPE_CHECKING:
@@ -28,7 +31,10 @@ def setup_routes(app: "Application"):
     app.router.add_view("/get_current_game", GetCurrentGame)
     app.router.add_view("/get_current_game_status", GetCurrentGameStatus)
     app.router.add_view("/get_current_game_state", GetCurrentGameState)
+    app.router.add_view("/chat_snapshot", GetChatSnapshot)
     app.router.add_view("/start_game", StartGame)
     app.router.add_view("/get_last_game", GetLastGame)
     app.router.add_view("/finish_game", FinishGame)
     app.router.add_view("/set_winner_and_loser", SetWinnerAndLoser)
+    app.router.add_view("/set_round_results", SetRoundResults)
+    app.router.add_view("/state_changes", GetStateChanges)
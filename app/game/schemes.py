@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class GameResultSchema(Schema):
@@ -8,6 +8,20 @@ class GameResultSchema(Schema):
     players = fields.Nested("PlayerSchema", many=True, required=True)
 
 
+class GameListQuerySchema(Schema):
+    after_id = fields.Int(required=False)
+    limit = fields.Int(
+        required=False, load_default=100, validate=validate.Range(1, 1000)
+    )
+    chat_id = fields.Int(required=False)
+    stream = fields.Bool(required=False, load_default=False)
+
+
+class GameListSchema(Schema):
+    games = fields.Nested(GameResultSchema, many=True, required=True)
+    next_after_id = fields.Int(required=False, allow_none=True)
+
+
 class GameSchema(Schema):
     id = fields.Int(required=False)
     chat_id = fields.Int(required=False)
@@ -21,3 +35,29 @@ class PlayerInGameSchema(Schema):
 
 class IsParticipantSchema(Schema):
     is_participant: fields.Bool(required=True)
+
+
+class ChatSnapshotSchema(Schema):
+    game_id = fields.Int(required=False, allow_none=True)
+    status = fields.Str(required=False, allow_none=True)
+    min_round = fields.Int(required=False, allow_none=True)
+    active_players = fields.Nested("PlayerSchema", many=True, required=True)
+
+
+class RoundResultSchema(Schema):
+    winner = fields.Nested("PlayerSchema", required=True)
+    loser = fields.Nested("PlayerSchema", required=False, allow_none=True)
+
+
+class RoundResultsSchema(Schema):
+    chat_id = fields.Int(required=True)
+    results = fields.Nested(RoundResultSchema, many=True, required=True)
+
+
+class StateChangesQuerySchema(Schema):
+    after = fields.Int(required=False, allow_none=True)
+
+
+class StateChangesSchema(Schema):
+    version = fields.Int(required=True)
+    chat_ids = fields.List(fields.Int(), required=True)
@@ -1,4 +1,10 @@
-from aiohttp_apispec import request_schema, response_schema
+import json
+
+from aiohttp_apispec import (
+    request_schema,
+    response_schema,
+    querystring_schema,
+)
 
 # from aiohttp_session import get_session
 from aiohttp.web import (
@@ -7,14 +13,21 @@ from aiohttp.web import (
     HTTPMethodNotAllowed,
     HTTPBadRequest,
     HTTPNotFound,
+    StreamResponse,
 )
 from web.app import View
 from web.utils import json_response
 from game.schemes import (
     GameResultSchema,
+    GameListQuerySchema,
+    GameListSchema,
     GameSchema,
     PlayerInGameSchema,
     IsParticipantSchema,
+    ChatSnapshotSchema,
+    RoundResultsSchema,
+    StateChangesQuerySchema,
+    StateChangesSchema,
 )
 from users.schemes import PlayerSchema
 from web.mixins import AuthRequiredMixin
@@ -22,12 +35,47 @@ from users.models import Player
 
 
 class GamesView(AuthRequiredMixin, View):
-    @response_schema(GameResultSchema, 200)
+    """
+    finished games page by page: ?after_id=<next_after_id>&limit=100
+    ?stream=true - all games after after_id as NDJSON, one game per line
+    """
+
+    @querystring_schema(GameListQuerySchema)
+    @response_schema(GameListSchema, 200)
     async def get(self):
-        gamescores = await self.request.app.store.game.get_all_games()
+        query = self.request["querystring"]
+        if query["stream"]:
+            return await self.stream_games(query)
+
+        gamescores = await self.request.app.store.game.get_all_games(
+            after_id=query.get("after_id"),
+            limit=query["limit"],
+            chat_id=query.get("chat_id"),
+        )
+        gamescores = gamescores or []
+        if len(gamescores) == query["limit"]:  # may be more games
+            next_after_id = gamescores[-1].game_id
+        else:
+            next_after_id = None
         return json_response(
-            data={"games": GameResultSchema().dump(gamescores, many=True)}
+            data={
+                "games": GameResultSchema().dump(gamescores, many=True),
+                "next_after_id": next_after_id,
+            }
+        )
+
+    async def stream_games(self, query: dict) -> StreamResponse:
+        response = StreamResponse(
+            headers={"Content-Type": "application/x-ndjson"}
         )
+        await response.prepare(self.request)
+        schema = GameResultSchema()
+        async for game in self.request.app.store.game.iter_games(
+            after_id=query.get("after_id"), chat_id=query.get("chat_id")
+        ):
+            await response.write(json.dumps(schema.dump(game)).encode() + b"\n")
+        await response.write_eof()
+        return response
 
 
 class CreateGame(View):
@@ -36,9 +84,9 @@ class CreateGame(View):
     async def post(self):
         data = await self.request.json()
         chat_id = data["chat_id"]
-        create_game = await self.request.app.store.game.create_game(chat_id)
-        if create_game:
-            return json_response(data={"chat_id": chat_id})
+        game_id = await self.request.app.store.game.create_game(chat_id)
+        if game_id:
+            return json_response(data={"chat_id": chat_id, "game_id": game_id})
         else:
             raise HTTPBadRequest
 
@@ -132,6 +180,20 @@ class GetCurrentGameState(View):
             raise HTTPBadRequest
 
 
+class GetChatSnapshot(View):
+    @request_schema(GameSchema)
+    @response_schema(ChatSnapshotSchema, 200)
+    async def post(self):
+        data = await self.request.json()
+        chat_id = data["chat_id"]
+        chat_snapshot = await self.request.app.store.game.get_chat_snapshot(
+            chat_id=chat_id
+        )
+        return json_response(
+            data={"chat_snapshot": ChatSnapshotSchema().dump(chat_snapshot)}
+        )
+
+
 class StartGame(View):
     @request_schema(GameSchema)
     @response_schema(GameSchema, 200)
@@ -198,3 +260,34 @@ class SetWinnerAndLoser(View):
             )
         )
         return json_response(data={"set_winner_and_loser": True})
+
+
+class SetRoundResults(View):
+    @request_schema(RoundResultsSchema)
+    async def post(self):
+        data = await self.request.json()
+        chat_id = data["chat_id"]
+        results = [
+            (
+                Player(**result["winner"]),
+                Player(**result["loser"]) if result.get("loser") else None,
+            )
+            for result in data["results"]
+        ]
+        await self.request.app.store.game.set_round_results(
+            chat_id=chat_id, results=results
+        )
+        return json_response(data={"set_round_results": True})
+
+
+class GetStateChanges(View):
+    @request_schema(StateChangesQuerySchema)
+    @response_schema(StateChangesSchema, 200)
+    async def post(self):
+        data = await self.request.json()
+        state_changes = await self.request.app.store.game.get_state_changes(
+            after=data.get("after")
+        )
+        return json_response(
+            data={"state_changes": StateChangesSchema().dump(state_changes)}
+        )
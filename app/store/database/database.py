@@ -1,3 +1,5 @@
+import time
+from dataclasses import dataclass, asdict
 from typing import Optional, TYPE_CHECKING
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -6,6 +8,8 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy import text
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from store.database.sqlalchemy_base import db
 
@@ -13,20 +17,72 @@ if TYPE_CHECKING:
     from web.app import Application
 
 
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    wait_total: float = 0.0  # seconds spent waiting for a connection
+    wait_max: float = 0.0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    default async pool + time spent in checkout (waiting for a free
+    connection or opening a new one)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.metrics.checkouts += 1
+            self.metrics.wait_total += waited
+            self.metrics.wait_max = max(self.metrics.wait_max, waited)
+
+
 class Database:
     def __init__(self, app: "Application"):
         self.app = app
-        # self._engine: Optional[AsyncEngine] = None
+        self._engine: Optional[AsyncEngine] = None
         # self._db: Optional[declarative_base] = None
         # self.session: Optional[AsyncSession] = None
         # self.connect()
 
     async def connect(self, *_: list, **__: dict) -> None:
+        config = self.app.config.database
+        connect_args = {}
+        if config.statement_timeout:  # ms, 0 - no timeout
+            connect_args["server_settings"] = {
+                "statement_timeout": str(config.statement_timeout)
+            }
+
         self._db = db
         self._engine = create_async_engine(
-            f"postgresql+asyncpg://{self.app.config.database.user}:"
-            f"{self.app.config.database.password}@{self.app.config.database.host}"
-            f"/{self.app.config.database.database}"
+            URL.create(
+                "postgresql+asyncpg",
+                username=config.user,
+                password=config.password,
+                host=config.host,
+                port=config.port,
+                database=config.database,
+                query={
+                    "prepared_statement_cache_size": str(
+                        config.prepared_statement_cache_size
+                    )
+                },
+            ),
+            poolclass=InstrumentedPool,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+            pool_recycle=config.pool_recycle,
+            pool_pre_ping=config.pool_pre_ping,
+            connect_args=connect_args,
         )
         self.session = sessionmaker(
             self._engine, expire_on_commit=False, class_=AsyncSession
@@ -34,4 +90,25 @@ class Database:
         print("Connected to Database", self.session)
 
     async def disconnect(self, *_: list, **__: dict) -> None:
-        pass
+        if self._engine:
+            await self._engine.dispose()
+            self._engine = None
+
+    def pool_stats(self) -> dict:
+        """
+        in_use close to size + max_overflow and growing wait - pool starvation
+        """
+        pool = self._engine.pool
+        metrics = pool.metrics
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            **asdict(metrics),
+            "wait_avg": (
+                metrics.wait_total / metrics.checkouts
+                if metrics.checkouts
+                else 0
+            ),
+        }
@@ -1,6 +1,8 @@
 import typing
 from typing import Optional, Union
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 
 from base.base_accessor import BaseAccessor
 from users.models import Player, PlayerModel
@@ -10,24 +12,38 @@ from game.models import (
     Game,
     GameScoreModel,
     GameResult,
+    ChatSnapshot,
+    StateChanges,
+    StateChangeModel,
 )
 from sqlalchemy import select, func, update, join
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 
 if typing.TYPE_CHECKING:
     from web.app import Application
 
+STREAM_BATCH_SIZE = 500  # rows fetched from server-side cursor at once
+
 
 class GameAcessor(BaseAccessor):
-    async def create_game(self, chat_id: int):
+    async def create_game(
+        self, chat_id: int, session: Optional[AsyncSession] = None
+    ) -> int:
         """
         assert that no games unfinished in this chat. If not - finish that game
-        create new record in db with "CREATED" status
+        create new record in db with "CREATED" status, return its id
         """
-        async with self.app.database.session.begin() as Session:
-            cur_game = await self.get_current_game(chat_id)
+        async with self.transaction(session) as Session:
+            # FOR UPDATE below locks nothing if chat has no game yet,
+            # so concurrent creates in a chat wait for each other here
+            await self.lock_chat(chat_id, session=Session)
+            cur_game = await self.get_current_game(
+                chat_id, session=Session, for_update=True
+            )
             if cur_game:
-                await self.finish_game(chat_id)
+                await self.finish_game(chat_id, session=Session)
             # await Session.execute(
             #     text(
             #         f"insert into games (chat_id, status) values ({chat_id}, 'CREATED')"
@@ -35,11 +51,22 @@ class GameAcessor(BaseAccessor):
             # )
             new_game = GameModel(chat_id=chat_id, status="CREATED")
             Session.add(new_game)
+            await Session.flush()
 
-            await Session.commit()
-            return True  # return for api - game is created
+            return new_game.id  # return for api - game is created
 
-    async def join_game(self, player: Player, chat_id: int) -> Optional[Player]:
+    async def lock_chat(self, chat_id: int, session: AsyncSession):
+        """
+        advisory lock by chat_id till the end of caller's transaction
+        """
+        await session.execute(select(func.pg_advisory_xact_lock(chat_id)))
+
+    async def join_game(
+        self,
+        player: Player,
+        chat_id: int,
+        session: Optional[AsyncSession] = None,
+    ) -> Optional[Player]:
         """
         trying to get player from db
         1) not exist: get profile photo -> create new db record
@@ -47,26 +74,33 @@ class GameAcessor(BaseAccessor):
         !!! Assuming players won't delete their photo from telegram
         !!! during game session, store only file_id
         if no profile photo - return None, else return player (existed or created)
+        all checks and inserts in one transaction, current game row is
+        locked - concurrent joins to this game wait for each other
         """
-        current_game = await self.get_current_game(chat_id)
+        async with self.transaction(session) as Session:
+            current_game = await self.get_current_game(
+                chat_id, session=Session, for_update=True
+            )
 
-        if not current_game:
-            return None
+            if not current_game:
+                return None
 
-        player_id = player.id
-        new_player = await self.app.store.user.get_user_by_id(player_id)
+            player_id = player.id
+            new_player = await self.app.store.user.get_user_by_id(
+                player_id, session=Session
+            )
 
-        async with self.app.database.session.begin() as Session:
             if not new_player:  # if not exist - create in db
-                new_player = await self.app.store.user.create_user(player)
+                new_player = await self.app.store.user.create_user(
+                    player, session=Session
+                )
                 if not new_player:
                     return None
             else:
                 already_in_game = await self.is_participant(
-                    player=new_player, chat_id=chat_id
+                    player=new_player, chat_id=chat_id, session=Session
                 )
                 if already_in_game:
-                    await Session.commit()
                     return new_player
 
                 photo_id = new_player.photo_file_id
@@ -100,16 +134,22 @@ class GameAcessor(BaseAccessor):
             )
             Session.add(gamescore)
 
-            await Session.commit()
             return new_player
 
-    async def is_participant(self, player: Player, chat_id: int) -> bool | None:
+    async def is_participant(
+        self,
+        player: Player,
+        chat_id: int,
+        session: Optional[AsyncSession] = None,
+    ) -> bool | None:
         """
         check if player already patricipant of current game in this chat
         """
-        current_game_id = await self.get_current_game(chat_id)
-        if current_game_id:
-            async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
+            current_game_id = await self.get_current_game(
+                chat_id, session=Session
+            )
+            if current_game_id:
                 # count = await Session.execute(
                 #     text(
                 #         f"select count(1) from gamescores where game_id={current_game_id} and player_id={player.id}"
@@ -125,28 +165,33 @@ class GameAcessor(BaseAccessor):
                 count = count.mappings().fetchone()["count"]
 
                 return False if count == 0 else True
-        else:
-            return None
+            else:
+                return None
 
     async def get_current_game(
-        self, chat_id: int
+        self,
+        chat_id: int,
+        session: Optional[AsyncSession] = None,
+        for_update: bool = False,
     ) -> Optional[int]:  # GameModel.id
         """
         select current game session from db, return game.id == gamescores.game_id
+        for_update - lock game row till the end of caller's transaction
         """
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
             # current_game = await Session.execute(
             #     text(
             #         f"select id from games where status!='FINISHED' and chat_id={chat_id};"
             #     )
             # )
             # current_game = current_game.mappings().fetchone()
-            current_game = await Session.execute(
-                select(GameModel.id).where(
-                    (GameModel.status != "FINISHED")
-                    & (GameModel.chat_id == chat_id)
-                )
+            query = select(GameModel.id).where(
+                (GameModel.status != "FINISHED")
+                & (GameModel.chat_id == chat_id)
             )
+            if for_update:
+                query = query.with_for_update()
+            current_game = await Session.execute(query)
             current_game_id = current_game.mappings().fetchone()
 
             if not current_game_id:  # no current_games
@@ -154,11 +199,13 @@ class GameAcessor(BaseAccessor):
             else:
                 return current_game_id["id"]
 
-    async def get_current_game_status(self, chat_id: int) -> Optional[str]:
+    async def get_current_game_status(
+        self, chat_id: int, session: Optional[AsyncSession] = None
+    ) -> Optional[str]:
         """
         select current game session from db, return game.status
         """
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
             # current_status = await Session.execute(
             #     text(
             #         f"select status from games where chat_id={chat_id} and status!='FINISHED';"
@@ -179,12 +226,14 @@ class GameAcessor(BaseAccessor):
                 assert len(current_status) == 1  # only one current game
                 return current_status["status"]
 
-    async def start_game(self, chat_id: int):
+    async def start_game(
+        self, chat_id: int, session: Optional[AsyncSession] = None
+    ):
         """
         set current game status to Started
         """
-        current_game = await self.get_current_game(chat_id)
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
+            current_game = await self.get_current_game(chat_id, session=Session)
             # await Session.execute(
             #     text(
             #         f"update games set status='STARTED' where id={current_game}"
@@ -197,17 +246,19 @@ class GameAcessor(BaseAccessor):
                 .where(GameModel.id == current_game)
                 .values(status="STARTED")
             )
-            await Session.commit()
 
-    async def get_current_game_state(self, chat_id) -> list[Player] | None:
+    async def get_current_game_state(
+        self, chat_id, session: Optional[AsyncSession] = None
+    ) -> list[Player] | None:
         """
         assuming current_game.status != 'FINISHED'
         find all active players (with player_status 1) and with minimal unfinished round number
         return list of active players
         """
-        current_game_id = await self.get_current_game(chat_id)
-
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
+            current_game_id = await self.get_current_game(
+                chat_id, session=Session
+            )
             if current_game_id:
                 # active_players_db = await Session.execute(
                 #     text(
@@ -271,6 +322,69 @@ class GameAcessor(BaseAccessor):
             else:
                 return None
 
+    async def get_chat_snapshot(
+        self, chat_id: int, session: Optional[AsyncSession] = None
+    ) -> ChatSnapshot:
+        """
+        current game id, status, min round and active players in one query
+        (the same data as get_current_game + _status + _state)
+        one row per active player, or one row with NULL players
+        """
+        scores = aliased(GameScoreModel)
+        min_round = (
+            select(func.min(scores.game_round))
+            .where(
+                (scores.game_id == GameModel.id) & (scores.player_status == 1)
+            )
+            .correlate(GameModel)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                GameModel.id.label("game_id"),
+                GameModel.status,
+                min_round.label("min_round"),
+                PlayerModel.id.label("player_id"),
+                PlayerModel.username,
+                PlayerModel.photo_file_id,
+            )
+            .select_from(GameModel)
+            .outerjoin(
+                GameScoreModel,
+                (GameScoreModel.game_id == GameModel.id)
+                & (GameScoreModel.player_status == 1)
+                & (GameScoreModel.game_round == min_round),
+            )
+            .outerjoin(PlayerModel, PlayerModel.id == GameScoreModel.player_id)
+            .where(
+                (GameModel.chat_id == chat_id)
+                & (GameModel.status != "FINISHED")
+            )
+        )
+
+        async with self.transaction(session) as Session:
+            rows = await Session.execute(query)
+            rows = rows.mappings().fetchall()
+
+        if not rows:  # no current game
+            return ChatSnapshot(
+                game_id=None, status=None, min_round=None, active_players=[]
+            )
+        return ChatSnapshot(
+            game_id=rows[0]["game_id"],
+            status=rows[0]["status"],
+            min_round=rows[0]["min_round"],
+            active_players=[
+                Player(
+                    id=row["player_id"],
+                    username=row["username"],
+                    photo_file_id=row["photo_file_id"],
+                )
+                for row in rows
+                if row["player_id"] is not None
+            ],
+        )
+
     @staticmethod
     def players_and_winners(
         players_raw: list,
@@ -298,12 +412,14 @@ class GameAcessor(BaseAccessor):
                 )
         return players, winner
 
-    async def get_last_game(self, chat_id: str) -> Optional[GameResult]:
+    async def get_last_game(
+        self, chat_id: str, session: Optional[AsyncSession] = None
+    ) -> Optional[GameResult]:
         """
         return last finished game statistic from db.gamescores in this chat
         can use created_at, bc no 2 running game at the same time
         """
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
             # last_game = await Session.execute(
             #     text(
             #         f"select games.id as game_id, players.id as player_id, "
@@ -352,73 +468,109 @@ class GameAcessor(BaseAccessor):
             else:
                 return None
 
+    @staticmethod
+    def all_games_query(
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        chat_id: Optional[int] = None,
+    ):
+        """
+        finished games (keyset page after after_id) joined with players,
+        ordered by game id - rows of one game go one after another
+        """
+        games = select(GameModel.id, GameModel.chat_id).where(
+            GameModel.status == "FINISHED"
+        )
+        if after_id is not None:
+            games = games.where(GameModel.id > after_id)
+        if chat_id is not None:
+            games = games.where(GameModel.chat_id == chat_id)
+        games = games.order_by(GameModel.id).limit(limit).subquery()
+
+        return (
+            select(
+                games.c.id.label("game_id"),
+                games.c.chat_id,
+                PlayerModel.id.label("player_id"),
+                PlayerModel.username.label("username"),
+                GameScoreModel.player_status,
+            )
+            .select_from(games)
+            .outerjoin(GameScoreModel, GameScoreModel.game_id == games.c.id)
+            .outerjoin(PlayerModel, PlayerModel.id == GameScoreModel.player_id)
+            .order_by(games.c.id)
+        )
+
+    @classmethod
+    def game_result(cls, game_rows: list) -> GameResult:
+        """
+        rows of one game from all_games_query -> GameResult
+        """
+        players, winner = cls.players_and_winners(
+            [row for row in game_rows if row["player_id"] is not None]
+        )
+        return GameResult(
+            game_id=game_rows[0]["game_id"],
+            chat_id=game_rows[0]["chat_id"],
+            players=players,
+            winner=winner,
+        )
+
     async def get_all_games(
         self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        chat_id: Optional[int] = None,
     ) -> list[GameResult] | None:  # game_id, chat_id, winner, players[]
         """
         return list with all records in gamescores like list of GameResult
         one finished game = one GameResult obj
+        games and their players come from one joined query ordered by
+        game id, so rows of one game are grouped in a single pass
+        after_id/limit - keyset page of games with id > after_id
         """
         async with self.app.database.session.begin() as Session:
-            # finished_games = await Session.execute(
-            #     text(
-            #         "select distinct id, chat_id from games where status='FINISHED';"
-            #     )
-            # )
-            # finished_games = finished_games.mappings().all()
+            rows = await Session.execute(
+                self.all_games_query(
+                    after_id=after_id, limit=limit, chat_id=chat_id
+                )
+            )
+            rows = rows.mappings().fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            self.game_result(list(game_rows))
+            for _, game_rows in groupby(rows, key=itemgetter("game_id"))
+        ]
 
-            finished_games = await Session.execute(
-                select(GameModel.id, GameModel.chat_id).distinct()
+    async def iter_games(
+        self, after_id: Optional[int] = None, chat_id: Optional[int] = None
+    ) -> typing.AsyncIterator[GameResult]:
+        """
+        same as get_all_games, but rows come from server-side cursor
+        and every game is yielded as soon as its rows are read
+        """
+        async with self.app.database.session.begin() as Session:
+            rows = await Session.stream(
+                self.all_games_query(after_id=after_id, chat_id=chat_id),
+                execution_options={"yield_per": STREAM_BATCH_SIZE},
             )
-            finished_games = finished_games.mappings().fetchall()
-
-            if finished_games:
-                all_games = []
-                for f_game in finished_games:
-                    game_id = f_game["id"]
-                    chat_id = f_game["chat_id"]
-                    # players_raw = await Session.execute(
-                    #     text(
-                    #         f"select players.id as player_id, players.username as username, "
-                    #         f"gamescores.player_status from players "
-                    #         f"left join gamescores on gamescores.player_id=players.id "
-                    #         f"where gamescores.game_id={game_id}; "
-                    #     )
-                    # )
-                    # # players_raw = players_raw.mappings().all()
-                    # players_raw = (await Session.query(PlayerModel.id.label("player_id"), PlayerModel.username.label("username"), GameScoreModel.player_status)
-                    #                .join(GameScoreModel, GameScoreModel.player_id == PlayerModel.id)
-                    #                .where(GameScoreModel.game_id == game_id)
-                    # ).all()
-                    players_raw = await Session.execute(
-                        select(
-                            PlayerModel.id.label("player_id"),
-                            PlayerModel.username.label("username"),
-                            GameScoreModel.player_status,
-                        )
-                        .join(
-                            GameScoreModel,
-                            GameScoreModel.player_id == PlayerModel.id,
-                        )
-                        .where(GameScoreModel.game_id == game_id)
-                    )
-                    players_raw = players_raw.mappings().fetchall()
-
-                    players, winner = self.players_and_winners(players_raw)
-                    all_games.append(
-                        GameResult(
-                            game_id=game_id,
-                            chat_id=chat_id,
-                            players=players,
-                            winner=winner,
-                        )
-                    )
-                return all_games
-            else:
-                return None
+            game_rows = []
+            async for row in rows.mappings():
+                if game_rows and row["game_id"] != game_rows[0]["game_id"]:
+                    yield self.game_result(game_rows)
+                    game_rows = []
+                game_rows.append(row)
+            if game_rows:
+                yield self.game_result(game_rows)
 
     async def finish_game(
-        self, chat_id: int, winner: Optional[Player] = None
+        self,
+        chat_id: int,
+        winner: Optional[Player] = None,
+        session: Optional[AsyncSession] = None,
     ) -> Optional[Player]:
         """
         get current game by chat_id, if get -> set status to "FINISHED"
@@ -427,10 +579,11 @@ class GameAcessor(BaseAccessor):
         else: return none
             set all user status in this game to 0 (lose)
         """
-        current_game_id = await self.get_current_game(chat_id)
-
-        if current_game_id:
-            async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
+            current_game_id = await self.get_current_game(
+                chat_id, session=Session
+            )
+            if current_game_id:
                 # await Session.execute(
                 #     text(
                 #         f"update games set status='FINISHED' where id={current_game_id}"
@@ -455,7 +608,6 @@ class GameAcessor(BaseAccessor):
                     )
                     winners_count = winners_count.mappings().fetchone()["sum"]
                     assert winners_count == 1
-                    await Session.commit()
                     return winner
                 else:  # no winner, unfinished game
                     # await Session.execute(
@@ -468,20 +620,23 @@ class GameAcessor(BaseAccessor):
                         .where(GameScoreModel.game_id == current_game_id)
                         .values(player_status=0)
                     )
-                    await Session.commit()
                     return None
-        else:
-            return None
+            else:
+                return None
 
     async def set_winner_and_loser(
-        self, chat_id: int, winner: Player, loser: Optional[Player] = None
+        self,
+        chat_id: int,
+        winner: Player,
+        loser: Optional[Player] = None,
+        session: Optional[AsyncSession] = None,
     ):
         """
         called after each pair-round,
         set status to loser = 0, set round to winner += 1
         """
-        current_game = await self.get_current_game(chat_id)
-        async with self.app.database.session.begin() as Session:
+        async with self.transaction(session) as Session:
+            current_game = await self.get_current_game(chat_id, session=Session)
             # await Session.execute(
             #     text(
             #         f"update gamescores set game_round=game_round+1 where player_id={winner.id} and game_id={current_game}"
@@ -514,4 +669,65 @@ class GameAcessor(BaseAccessor):
                     )
                     .values(player_status=0)
                 )
-            await Session.commit()
+
+    async def set_round_results(
+        self,
+        chat_id: int,
+        results: list[tuple[Player, Optional[Player]]],
+        session: Optional[AsyncSession] = None,
+    ):
+        """
+        set_winner_and_loser for all pairs of the round at once:
+        one transaction, one UPDATE for winners and one for losers
+        results - list of (winner, loser), loser is None for auto-win
+        """
+        winner_ids = [winner.id for winner, _ in results]
+        loser_ids = [loser.id for _, loser in results if loser]
+        async with self.transaction(session) as Session:
+            current_game = await self.get_current_game(chat_id, session=Session)
+            if winner_ids:
+                await Session.execute(
+                    update(GameScoreModel)
+                    .where(
+                        (GameScoreModel.game_id == current_game)
+                        & (GameScoreModel.player_id.in_(winner_ids))
+                    )
+                    .values(game_round=(GameScoreModel.game_round + 1))
+                )
+            if loser_ids:
+                await Session.execute(
+                    update(GameScoreModel)
+                    .where(
+                        (GameScoreModel.game_id == current_game)
+                        & (GameScoreModel.player_id.in_(loser_ids))
+                    )
+                    .values(player_status=0)
+                )
+
+    async def get_state_changes(
+        self, after: Optional[int] = None
+    ) -> StateChanges:
+        """
+        chats changed outside the manager since version after
+        after=None - only current version, nothing to invalidate yet
+        """
+        async with self.app.database.session.begin() as Session:
+            if after is None:
+                version = await Session.execute(
+                    select(func.max(StateChangeModel.id))
+                )
+                return StateChanges(version=version.scalar() or 0, chat_ids=[])
+
+            rows = await Session.execute(
+                select(StateChangeModel.id, StateChangeModel.chat_id)
+                .where(StateChangeModel.id > after)
+                .order_by(StateChangeModel.id)
+            )
+            rows = rows.mappings().fetchall()
+
+        if not rows:
+            return StateChanges(version=after, chat_ids=[])
+        return StateChanges(
+            version=rows[-1]["id"],
+            chat_ids=list({row["chat_id"] for row in rows}),
+        )
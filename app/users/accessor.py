@@ -2,25 +2,32 @@ import typing
 
 from base.base_accessor import BaseAccessor
 from users.models import PlayerModel, Player, Admin, AdminModel
+from game.models import GameModel, GameScoreModel, StateChangeModel
 from typing import Optional
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from hashlib import sha256
 
 
 class UserAccessor(BaseAccessor):
-    async def create_user(self, user: Player) -> Optional[Player]:
-        async with self.app.database.session.begin() as Session:
+    async def create_user(
+        self, user: Player, session: Optional[AsyncSession] = None
+    ) -> Optional[Player]:
+        async with self.transaction(session) as Session:
             new_player = PlayerModel(
                 id=user.id,
                 username=user.username,
                 photo_file_id=user.photo_file_id,
             )
             Session.add(new_player)
-            await Session.commit()
+            # gamescores row of the same transaction references this player
+            await Session.flush()
             return user
 
-    async def get_user_by_id(self, player_id: int) -> Optional[Player]:
-        async with self.app.database.session.begin() as Session:
+    async def get_user_by_id(
+        self, player_id: int, session: Optional[AsyncSession] = None
+    ) -> Optional[Player]:
+        async with self.transaction(session) as Session:
             player = await Session.execute(
                 select(
                     PlayerModel.id,
@@ -39,15 +46,33 @@ class UserAccessor(BaseAccessor):
             else:
                 return None
 
-    async def delete_player_by_id(self, player_id):
-        async with self.app.database.session.begin() as Session:
+    async def delete_player_by_id(
+        self, player_id, session: Optional[AsyncSession] = None
+    ):
+        """
+        gamescores go with the player (cascade), so unfinished games
+        of the player are journaled in state_changes in the same transaction
+        """
+        async with self.transaction(session) as Session:
+            await Session.execute(
+                insert(StateChangeModel).from_select(
+                    ["chat_id"],
+                    select(GameModel.chat_id)
+                    .join(
+                        GameScoreModel, GameScoreModel.game_id == GameModel.id
+                    )
+                    .where(
+                        (GameScoreModel.player_id == player_id)
+                        & (GameModel.status != "FINISHED")
+                    ),
+                )
+            )
             # await Session.execute(
             #     text(f"delete from players where id={player_id};")
             # )
             await Session.execute(
                 delete(PlayerModel).where(PlayerModel.id == player_id)
             )
-            await Session.commit()
 
     async def get_admin_by_email(self, email: str) -> Admin | None:
         async with self.app.database.session.begin() as Session:
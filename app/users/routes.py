@@ -2,7 +2,12 @@ from aiohttp.web_app import Application
 
 import typing
 
-from users.views import AdminLoginView, AdminCurrentView, DeletePlayerView
+from users.views import (
+    AdminLoginView,
+    AdminCurrentView,
+    AdminDatabaseStatsView,
+    DeletePlayerView,
+)
 
 if typing.TYPE_CHECKING:
     from web.app import Application
@@ -11,4 +16,5 @@ if typing.TYPE_CHECKING:
 def setup_routes(app: "Application"):
     app.router.add_view("/admin.login", AdminLoginView)
     app.router.add_view("/admin.current", AdminCurrentView)
+    app.router.add_view("/admin.db_stats", AdminDatabaseStatsView)
     app.router.add_view("/delete_player", DeletePlayerView)
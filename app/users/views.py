@@ -71,3 +71,8 @@ class DeletePlayerView(AuthRequiredMixin, View):
             return json_response(data={"removed": PlayerSchema().dump(player)})
         else:
             raise HTTPBadRequest
+
+
+class AdminDatabaseStatsView(AuthRequiredMixin, View):
+    async def get(self):
+        return json_response(data=self.request.app.database.pool_stats())
@@ -24,6 +24,13 @@ class DatabaseConfig:
     user: str = "postgres"
     password: str = "postgres"
     database: str = "game_kts"
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30  # seconds to wait for free connection
+    pool_recycle: int = 1800  # seconds, -1 - never
+    pool_pre_ping: bool = True
+    statement_timeout: int = 0  # ms, 0 - no timeout
+    prepared_statement_cache_size: int = 100
 
 
 @dataclass
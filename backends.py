@@ -0,0 +1,219 @@
+import json
+import os
+import sys
+from dataclasses import asdict
+from typing import Optional, Any
+from aiohttp.client import ClientSession
+from aiohttp import TCPConnector
+
+
+class Backend:
+    """
+    how Manager reaches game data: request(route, params) returns
+    the same payload as web app route, or None on error
+    """
+
+    async def start(self):
+        return
+
+    async def stop(self):
+        return
+
+    async def request(self, route: str, params: Optional[dict]) -> Any:
+        raise NotImplementedError
+
+
+class HttpBackend(Backend):
+    """
+    POST json to aiohttp web app, default for separate deployment
+    """
+
+    # key of response["data"] for every route
+    result_return = {
+        "create_game": "game_id",
+        "join_game": "player",
+        "is_participant": "is_participant",
+        "get_current_game": "current_game_id",
+        "get_current_game_state": "active_players",
+        "get_current_game_status": "current_game_status",
+        "chat_snapshot": "chat_snapshot",
+        "start_game": "start_game",
+        "get_last_game": "last_game",
+        "finish_game": "winner",
+        "set_winner_and_loser": "set_winner_and_loser",
+        "set_round_results": "set_round_results",
+        "state_changes": "state_changes",
+    }
+
+    def __init__(self, url: str = "http://web:8080/"):
+        self.url = url
+        self.session: Optional[ClientSession] = None
+
+    async def start(self):
+        self.session = ClientSession(connector=TCPConnector(ssl=False))
+
+    async def stop(self):
+        if self.session:
+            await self.session.close()
+
+    async def request(self, route: str, params: Optional[dict]) -> Any:
+        data = json.dumps(params)
+        async with self.session.post(
+            url=f"{self.url}{route}",
+            data=data,
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            results = await response.json()
+
+            if results["status"] == "ok":
+                data = results["data"]
+                return data[self.result_return[route]]
+            else:
+                return None
+
+
+class DirectBackend(Backend):
+    """
+    call app store accessors in-process on own Database pool
+    no HTTP, middlewares and schemas on the way to GameAcessor
+    needs app/ sources and app/requirements.txt installed
+    """
+
+    def __init__(self, app_path: str, config_path: str):
+        self.app_path = app_path
+        self.config_path = config_path
+        self.app = None
+        self.routes = {
+            "create_game": self.create_game,
+            "join_game": self.join_game,
+            "is_participant": self.is_participant,
+            "get_current_game": self.get_current_game,
+            "get_current_game_state": self.get_current_game_state,
+            "get_current_game_status": self.get_current_game_status,
+            "chat_snapshot": self.chat_snapshot,
+            "start_game": self.start_game,
+            "get_last_game": self.get_last_game,
+            "finish_game": self.finish_game,
+            "set_winner_and_loser": self.set_winner_and_loser,
+            "set_round_results": self.set_round_results,
+            "state_changes": self.state_changes,
+        }
+
+    async def start(self):
+        # app modules are imported as top-level packages (web, store, ...)
+        sys.path.insert(0, self.app_path)
+        from web.app import Application
+        from web.config import setup_config
+        from store import setup_store
+
+        self.app = Application()
+        setup_config(self.app, self.config_path)
+        setup_store(self.app)
+        await self.app.database.connect()
+
+    async def stop(self):
+        if self.app:
+            await self.app.database.disconnect()
+
+    @property
+    def store(self):
+        return self.app.store
+
+    async def request(self, route: str, params: Optional[dict]) -> Any:
+        try:
+            return await self.routes[route](**params)
+        except Exception as e:  # same as error response from web app
+            print("Backend request failed", route, repr(e))
+            return None
+
+    async def create_game(self, chat_id: int):
+        return await self.store.game.create_game(chat_id)
+
+    async def join_game(self, chat_id: int, player: dict):
+        from users.models import Player
+
+        join_game = await self.store.game.join_game(
+            chat_id=chat_id, player=Player(**player)
+        )
+        if join_game:
+            return asdict(join_game)
+
+    async def is_participant(self, chat_id: int, player: dict):
+        from users.models import Player
+
+        return await self.store.game.is_participant(
+            chat_id=chat_id, player=Player(**player)
+        )
+
+    async def get_current_game(self, chat_id: int):
+        return await self.store.game.get_current_game(chat_id=chat_id)
+
+    async def get_current_game_status(self, chat_id: int):
+        return await self.store.game.get_current_game_status(chat_id=chat_id)
+
+    async def get_current_game_state(self, chat_id: int):
+        active_players = await self.store.game.get_current_game_state(
+            chat_id=chat_id
+        )
+        if active_players:
+            return [asdict(player) for player in active_players]
+
+    async def chat_snapshot(self, chat_id: int):
+        return asdict(await self.store.game.get_chat_snapshot(chat_id=chat_id))
+
+    async def start_game(self, chat_id: int):
+        if await self.store.game.start_game(chat_id):
+            return True
+
+    async def get_last_game(self, chat_id: int):
+        last_game = await self.store.game.get_last_game(chat_id)
+        if last_game is not None:
+            return asdict(last_game)
+
+    async def finish_game(self, chat_id: int, winner: Optional[dict] = None):
+        return await self.store.game.finish_game(chat_id=chat_id, winner=winner)
+
+    async def set_winner_and_loser(
+        self, chat_id: int, winner: dict, loser: Optional[dict] = None
+    ):
+        from users.models import Player
+
+        await self.store.game.set_winner_and_loser(
+            chat_id=chat_id,
+            winner=Player(**winner),
+            loser=Player(**loser) if loser else None,
+        )
+        return True
+
+    async def set_round_results(self, chat_id: int, results: list[dict]):
+        from users.models import Player
+
+        await self.store.game.set_round_results(
+            chat_id=chat_id,
+            results=[
+                (
+                    Player(**result["winner"]),
+                    Player(**result["loser"]) if result.get("loser") else None,
+                )
+                for result in results
+            ],
+        )
+        return True
+
+    async def state_changes(self, after: Optional[int] = None):
+        return asdict(await self.store.game.get_state_changes(after=after))
+
+
+def setup_backend() -> Backend:
+    """
+    MANAGER_BACKEND=http (default) or direct, when deployed with web app
+    """
+    if os.environ.get("MANAGER_BACKEND", "http") == "direct":
+        app_path = os.path.abspath(os.environ.get("APP_PATH", "app"))
+        return DirectBackend(
+            app_path=app_path,
+            config_path=os.environ.get(
+                "APP_CONFIG", os.path.join(app_path, "config.yml")
+            ),
+        )
+    return HttpBackend(url=os.environ.get("WEB_URL", "http://web:8080/"))
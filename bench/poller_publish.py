@@ -0,0 +1,98 @@
+"""
+updates/s of the poller publishing getUpdates batches: one by one,
+each waiting for its confirm (before), and pipelined publish_batch
+(after), against a broker stand-in that confirms after --rtt ms
+
+    python bench/poller_publish.py --rtt 2 --batch 100 --batches 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import poller  # noqa: E402
+
+
+class ConfirmingExchange:
+    """
+    confirm comes rtt seconds after publish, publishes in flight overlap
+    like on a real channel in confirm mode
+    """
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.published = 0
+
+    async def publish(self, message, routing_key):
+        await asyncio.sleep(self.rtt)
+        self.published += 1
+
+
+class FakeChannel:
+    def __init__(self, exchange):
+        self.default_exchange = exchange
+
+
+def make_batches(batches: int, batch: int) -> list[list[dict]]:
+    return [
+        [
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "from": {"id": update_id % 500, "username": "player"},
+                    "chat": {"id": -1000 - update_id % 50},
+                    "text": "/start",
+                },
+            }
+            for update_id in range(start, start + batch)
+        ]
+        for start in range(1, batches * batch, batch)
+    ]
+
+
+async def sequential(bench_poller, updates: list[dict]):
+    for update in updates:
+        await bench_poller.publish(update)
+        bench_poller.offset = update["update_id"] + 1
+    bench_poller.save_offset()
+
+
+async def pipelined(bench_poller, updates: list[dict]):
+    await bench_poller.publish_batch(updates)
+
+
+async def measure(mode, args) -> float:
+    exchange = ConfirmingExchange(args.rtt / 1000)
+    bench_poller = poller.Poller()
+    bench_poller.channel = FakeChannel(exchange)
+    batches = make_batches(args.batches, args.batch)
+    started = time.perf_counter()
+    for updates in batches:
+        await mode(bench_poller, updates)
+    elapsed = time.perf_counter() - started
+    assert exchange.published == args.batches * args.batch
+    assert bench_poller.offset == batches[-1][-1]["update_id"] + 1
+    return exchange.published / elapsed
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        poller.OFFSET_FILE = os.path.join(directory, "offset")
+        before = await measure(sequential, args)
+        after = await measure(pipelined, args)
+    print(f"rtt {args.rtt} ms, {args.batches} batches of {args.batch} updates")
+    print(f"sequential: {before:10.0f} updates/s")
+    print(f"pipelined:  {after:10.0f} updates/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rtt", type=float, default=2, help="confirm, ms")
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--batches", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
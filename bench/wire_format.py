@@ -0,0 +1,140 @@
+"""
+bytes per update and encode/decode cost of incoming updates:
+raw telegram json (before) vs packed update in msgpack (after)
+and in json (WIRE_FORMAT=json)
+
+    python bench/wire_format.py --number 100000
+
+encode - work of the poller, decode - work of the manager, both
+up to the Update dataclass (field extraction moved to the poller)
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire  # noqa: E402
+
+CHAT = {"id": -1001234567890, "title": "PhotoBattle chat", "type": "supergroup"}
+USER = {
+    "id": 123456789,
+    "is_bot": False,
+    "first_name": "Ivan",
+    "last_name": "Petrov",
+    "username": "ivan_petrov",
+    "language_code": "ru",
+}
+
+UPDATES = {
+    "command": {
+        "update_id": 912345678,
+        "message": {
+            "message_id": 4321,
+            "from": USER,
+            "chat": CHAT,
+            "date": 1700000000,
+            "text": "/start@PhotoBattleBot",
+            "entities": [{"offset": 0, "length": 21, "type": "bot_command"}],
+        },
+    },
+    "photo, no username": {
+        "update_id": 912345679,
+        "message": {
+            "message_id": 4322,
+            "from": {"id": 987654321, "is_bot": False, "first_name": "Anna"},
+            "chat": CHAT,
+            "date": 1700000001,
+            "photo": [
+                {
+                    "file_id": "AgACAgIAAxkBAAIBY2V" + "x" * 60,
+                    "file_unique_id": "AQADd8sxG1" + str(size),
+                    "file_size": size * 100,
+                    "width": size,
+                    "height": size,
+                }
+                for size in (90, 320, 800, 1280)
+            ],
+        },
+    },
+    "vote": {
+        "update_id": 912345680,
+        "callback_query": {
+            "id": "4382195723984712",
+            "from": USER,
+            "message": {
+                "message_id": 4323,
+                "from": {
+                    "id": 5555555555,
+                    "is_bot": True,
+                    "first_name": "PhotoBattle",
+                    "username": "PhotoBattleBot",
+                },
+                "chat": CHAT,
+                "date": 1700000002,
+                "text": "🗳️Проголосуйте за одного из участников.",
+                "reply_markup": {
+                    "inline_keyboard": [
+                        [
+                            {"text": "Игрок 1", "callback_data": "voted_for_1"},
+                            {"text": "Игрок 2", "callback_data": "voted_for_2"},
+                        ]
+                    ]
+                },
+            },
+            "chat_instance": "-5381951325123",
+            "data": "voted_for_1",
+        },
+    },
+}
+
+
+def usec(function, number: int) -> float:
+    return timeit.timeit(function, number=number) / number * 1e6
+
+
+def measure(raw: dict, number: int) -> dict:
+    update = wire.extract_update(raw)
+    raw_body = json.dumps(raw).encode()
+    results = {"raw json": (len(raw_body),)}
+    results["raw json"] += (
+        usec(lambda: json.dumps(raw).encode(), number),
+        usec(lambda: wire.extract_update(json.loads(raw_body)), number),
+    )
+    for name, content_type in (("msgpack", wire.MSGPACK), ("json", wire.JSON)):
+        body = wire.dumps(wire.pack_update(update), content_type)
+        assert wire.unpack_update(wire.loads(body, content_type)) == update
+        results[name] = (
+            len(body),
+            usec(
+                lambda: wire.dumps(
+                    wire.pack_update(wire.extract_update(raw)), content_type
+                ),
+                number,
+            ),
+            usec(
+                lambda: wire.unpack_update(wire.loads(body, content_type)),
+                number,
+            ),
+        )
+    return results
+
+
+def main(args):
+    print(
+        f"{'update':<20}{'format':<10}{'bytes':>7}{'encode':>10}{'decode':>10}"
+    )
+    for update_name, raw in UPDATES.items():
+        for name, (size, encode, decode) in measure(raw, args.number).items():
+            print(
+                f"{update_name:<20}{name:<10}{size:>7}"
+                f"{encode:>8.2f}us{decode:>8.2f}us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+# chat_snapshot of a chat without current game
+NO_GAME = {
+    "game_id": None,
+    "status": None,
+    "min_round": None,
+    "active_players": [],
+}
+
+
+class GameStateCache:
+    """
+    chat_snapshot of a chat by chat_id, LRU with TTL
+    manager is the only writer of game state, so its writes update entries
+    in place (write-through), changes from admin API come as versioned
+    state_changes and drop affected entries
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self.version: Optional[int] = None  # last seen state_changes version
+        self.writes = 0  # fills started before a write are stale
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, chat_id: int) -> Optional[dict]:
+        entry = self.entries.get(chat_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[chat_id]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(chat_id)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, chat_id: int) -> Optional[dict]:
+        """
+        cached snapshot without touching LRU order and stats
+        """
+        entry = self.entries.get(chat_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def fill(self, chat_id: int, snapshot: dict, writes: int):
+        """
+        put snapshot read from db, writes - self.writes before the read
+        skipped if any write happened meanwhile
+        """
+        if writes == self.writes:
+            self.put(chat_id, snapshot)
+
+    def put(self, chat_id: int, snapshot: dict):
+        self.entries[chat_id] = (time.monotonic() + self.ttl, snapshot)
+        self.entries.move_to_end(chat_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def write(self, chat_id: int, snapshot: dict):
+        """
+        write-through after manager's own write
+        """
+        self.writes += 1
+        self.put(chat_id, snapshot)
+
+    def update(self, chat_id: int, **fields):
+        """
+        write-through of some fields, only for already cached chat
+        """
+        self.writes += 1
+        snapshot = self.peek(chat_id)
+        if snapshot is not None:
+            self.put(chat_id, {**snapshot, **fields})
+
+    def invalidate(self, chat_id: int):
+        self.writes += 1
+        if self.entries.pop(chat_id, None) is not None:
+            self.invalidations += 1
+
+    def apply_changes(self, state_changes: dict):
+        """
+        state_changes - {"version": int, "chat_ids": [...]}
+        """
+        for chat_id in state_changes["chat_ids"]:
+            self.invalidate(chat_id)
+        self.version = state_changes["version"]
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "version": self.version,
+        }
+
+
+class SeenUpdates:
+    """
+    update_ids seen during the last window seconds, for de-duplication
+    of replayed updates (poller restart, webhook redelivery)
+    ids are kept in time buckets, the oldest bucket is dropped as a whole
+    """
+
+    def __init__(self, window: float = 600, buckets: int = 10):
+        self.bucket_width = window / buckets
+        self.max_buckets = buckets
+        self.buckets: deque[tuple[float, set[int]]] = deque()
+        self.duplicates = 0
+
+    def expire(self):
+        now = time.monotonic()
+        while self.buckets and (
+            len(self.buckets) > self.max_buckets
+            or self.buckets[0][0] + self.bucket_width * self.max_buckets < now
+        ):
+            self.buckets.popleft()
+
+    def contains(self, update_id: int) -> bool:
+        self.expire()
+        for _, ids in self.buckets:
+            if update_id in ids:
+                self.duplicates += 1
+                return True
+        return False
+
+    def add(self, update_id: int):
+        """
+        remember update_id once the update is handled,
+        failed update can be redelivered and handled again
+        """
+        self.expire()
+        now = time.monotonic()
+        if not self.buckets or self.buckets[-1][0] + self.bucket_width <= now:
+            self.buckets.append((now, set()))
+        self.buckets[-1][1].add(update_id)
+
+    def stats(self) -> dict:
+        return {
+            "size": sum(len(ids) for _, ids in self.buckets),
+            "duplicates": self.duplicates,
+        }
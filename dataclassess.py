@@ -1,6 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
+# photo of blank player: "placeholder:<cat phrase>", Sender picks the image
+PLACEHOLDER_PREFIX = "placeholder:"
+
 
 @dataclass
 class Player:
@@ -14,7 +17,7 @@ class UpdateObject:
     id: int
     user: Player
     chat_id: str
-    text: str
+    text: Optional[str]
     data: Optional[str] = None
     callback_query_id: Optional[str] = None
 
@@ -26,6 +29,39 @@ class Update:
     object: UpdateObject
 
 
+@dataclass
+class GameRound:
+    """
+    round in progress in a chat: pairs still to battle, results so far,
+    next phase (Manager method name) and its deadline (time.time() based)
+    """
+
+    chat_id: int
+    pairs: list[tuple[Player, Player]]
+    battle: Optional[tuple[Player, Player]] = None
+    results: list[dict] = field(default_factory=list)
+    phase: Optional[str] = None
+    deadline: Optional[float] = None
+
+
+def load_game_round(data: dict) -> GameRound:
+    """
+    GameRound from asdict() of it, saved by the state backend
+    """
+    battle = data.get("battle")
+    return GameRound(
+        chat_id=data["chat_id"],
+        pairs=[
+            (Player(**player_1), Player(**player_2))
+            for player_1, player_2 in data["pairs"]
+        ],
+        battle=tuple(Player(**player) for player in battle) if battle else None,
+        results=data.get("results") or [],
+        phase=data.get("phase"),
+        deadline=data.get("deadline"),
+    )
+
+
 @dataclass
 class Message:
     chat_id: Optional[int]
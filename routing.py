@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+
+INCOMING_QUEUE = "incoming_updates"
+# incoming updates are split into SHARDS queues by chat_id,
+# every shard is consumed by exactly one manager replica
+SHARDS = int(os.environ.get("UPDATE_SHARDS", 1))
+REPLICAS = int(os.environ.get("MANAGER_REPLICAS", 1))
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    jump consistent hash (Lamping, Veach): when buckets grows from n to n+1
+    only 1/(n+1) of keys move, all of them to the new bucket
+    """
+    key &= 0xFFFFFFFFFFFFFFFF  # chat ids of groups are negative
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_of(chat_id: Optional[int], shards: int = SHARDS) -> int:
+    if chat_id is None:  # no chat - any shard can handle
+        return 0
+    return jump_hash(chat_id, shards)
+
+
+def queue_name(shard: int, shards: int = SHARDS) -> str:
+    """
+    incoming updates queue of a shard, single shard keeps the old name
+    """
+    if shards == 1:
+        return INCOMING_QUEUE
+    return f"{INCOMING_QUEUE}.{shard}"
+
+
+def replica_shards(
+    replica: int, replicas: int = REPLICAS, shards: int = SHARDS
+) -> list[int]:
+    """
+    shards consumed by a replica: MANAGER_SHARDS="0,3,5" if set,
+    else every replicas-th shard starting from replica
+    """
+    explicit = os.environ.get("MANAGER_SHARDS")
+    if explicit:
+        return [int(shard) for shard in explicit.split(",")]
+    return list(range(replica, shards, replicas))
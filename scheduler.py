@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import itertools
+from typing import Any, Callable, Hashable, Optional
+
+
+class Timer:
+    __slots__ = ("when", "callback", "args", "key", "cancelled")
+
+    def __init__(
+        self,
+        when: float,
+        callback: Callable,
+        args: tuple,
+        key: Optional[Hashable] = None,
+    ):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.key = key
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    all timers of the manager (voting deadlines, pauses between messages)
+    in one heap, served by a single loop callback set to the earliest one
+    timers with key can be found later to be cancelled or extended
+    callback may be a function or a coroutine function (run as a task)
+    """
+
+    def __init__(self):
+        self.heap: list[tuple[float, int, Timer]] = []
+        self.timers: dict[Hashable, Timer] = {}  # by key
+        self.counter = itertools.count()  # keeps heap order stable
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.tasks: set[asyncio.Task] = set()  # running coroutine callbacks
+        self.pending = 0
+        self.fired = 0
+
+    def call_at(
+        self,
+        when: float,
+        callback: Callable,
+        *args: Any,
+        key: Optional[Hashable] = None,
+    ) -> Timer:
+        """
+        when - loop.time() based, timer with the same key is replaced
+        """
+        if key is not None:
+            self.cancel(key)
+        timer = Timer(when, callback, args, key)
+        if key is not None:
+            self.timers[key] = timer
+        heapq.heappush(self.heap, (when, next(self.counter), timer))
+        self.pending += 1
+        self.wake()
+        return timer
+
+    def call_later(
+        self,
+        delay: float,
+        callback: Callable,
+        *args: Any,
+        key: Optional[Hashable] = None,
+    ) -> Timer:
+        loop = asyncio.get_running_loop()
+        return self.call_at(loop.time() + delay, callback, *args, key=key)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self.timers.get(key)
+        if timer is None:
+            return False
+        self.remove(timer)
+        return True
+
+    def extend(self, key: Hashable, delay: float) -> bool:
+        """
+        move deadline of the key timer by delay seconds
+        """
+        timer = self.timers.get(key)
+        if timer is None:
+            return False
+        self.remove(timer)
+        self.call_at(
+            timer.when + delay,
+            timer.callback,
+            *timer.args,
+            key=key,
+        )
+        return True
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        timer = self.timers.get(key)
+        if timer is None:
+            return None
+        return max(0.0, timer.when - asyncio.get_running_loop().time())
+
+    def remove(self, timer: Timer):
+        """
+        drop timer lazily, heap entry is skipped when its time comes
+        """
+        if timer.cancelled:
+            return None
+        timer.cancelled = True
+        self.pending -= 1
+        if timer.key is not None and self.timers.get(timer.key) is timer:
+            self.timers.pop(timer.key)
+        if len(self.heap) > 2 * self.pending + 64:  # mostly cancelled
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+
+    def wake(self):
+        """
+        set loop callback to the earliest deadline
+        """
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        earliest = self.heap[0][0]
+        if self.handle is not None:
+            if self.handle.when() <= earliest:
+                return None
+            self.handle.cancel()
+        self.handle = asyncio.get_running_loop().call_at(earliest, self.run)
+
+    def run(self):
+        self.handle = None
+        now = asyncio.get_running_loop().time()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                continue
+            timer.cancelled = True  # fired, not pending any more
+            self.pending -= 1
+            self.fired += 1
+            if timer.key is not None and self.timers.get(timer.key) is timer:
+                self.timers.pop(timer.key)
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+            except Exception as e:
+                print("Timer callback failed", repr(e))
+        self.wake()
+
+    async def stop(self):
+        """
+        drop all timers, cancel running callbacks and wait for them
+        """
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        for _, _, timer in self.heap:
+            timer.cancelled = True
+        self.heap.clear()
+        self.timers.clear()
+        self.pending = 0
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "fired": self.fired,
+            "keyed": len(self.timers),
+            "running": len(self.tasks),
+        }
@@ -0,0 +1,246 @@
+import json
+import os
+import time
+from typing import Optional
+
+VOTING_GRACE = 30  # seconds a voting outlives its timer, then it's stale
+
+
+class StateBackend:
+    """
+    where manager keeps votings, running rounds and last inline keyboards
+    of chats
+    """
+
+    async def start(self):
+        return
+
+    async def stop(self):
+        return
+
+    async def start_voting(self, chat_id: int, timeout: float):
+        raise NotImplementedError
+
+    async def is_voting(self, chat_id: int) -> bool:
+        raise NotImplementedError
+
+    async def vote(
+        self, chat_id: int, user_id: int, delta: int
+    ) -> Optional[bool]:
+        """
+        True - vote counted, False - user already voted, None - no voting
+        """
+        raise NotImplementedError
+
+    async def finish_voting(self, chat_id: int) -> int:
+        """
+        remove voting, return its counter
+        """
+        raise NotImplementedError
+
+    async def set_last_inline(self, chat_id: int, message_id: int):
+        raise NotImplementedError
+
+    async def pop_last_inline(self, chat_id: int) -> Optional[int]:
+        raise NotImplementedError
+
+    async def save_round(self, chat_id: int, game_round: dict):
+        """
+        game round as asdict(GameRound), replaces the saved one
+        """
+        raise NotImplementedError
+
+    async def delete_round(self, chat_id: int):
+        raise NotImplementedError
+
+    async def load_rounds(self) -> list[dict]:
+        raise NotImplementedError
+
+
+class InMemoryState(StateBackend):
+    """
+    state of one manager process, lost on restart
+    """
+
+    def __init__(self):
+        self.votings: dict[int, dict] = {}
+        self.last_inline: dict[int, int] = {}
+        self.rounds: dict[int, dict] = {}
+
+    async def start_voting(self, chat_id: int, timeout: float):
+        self.votings[chat_id] = {
+            "voted_players": set(),
+            "counter": 0,
+            "expires_at": time.monotonic() + timeout + VOTING_GRACE,
+        }
+
+    async def is_voting(self, chat_id: int) -> bool:
+        voting = self.votings.get(chat_id)
+        return voting is not None and voting["expires_at"] > time.monotonic()
+
+    async def vote(
+        self, chat_id: int, user_id: int, delta: int
+    ) -> Optional[bool]:
+        if not await self.is_voting(chat_id):
+            return None
+        voting = self.votings[chat_id]
+        if user_id in voting["voted_players"]:
+            return False
+        voting["voted_players"].add(user_id)
+        voting["counter"] += delta
+        return True
+
+    async def finish_voting(self, chat_id: int) -> int:
+        voting = self.votings.pop(chat_id, None)
+        return voting["counter"] if voting else 0
+
+    async def set_last_inline(self, chat_id: int, message_id: int):
+        self.last_inline[chat_id] = message_id
+
+    async def pop_last_inline(self, chat_id: int) -> Optional[int]:
+        return self.last_inline.pop(chat_id, None)
+
+    async def save_round(self, chat_id: int, game_round: dict):
+        self.rounds[chat_id] = game_round
+
+    async def delete_round(self, chat_id: int):
+        self.rounds.pop(chat_id, None)
+
+    async def load_rounds(self) -> list[dict]:
+        return list(self.rounds.values())
+
+
+class PostgresState(StateBackend):
+    """
+    votings, voters, running rounds and last inline keyboards in app
+    database (tables votings, voting_voters, game_rounds, last_inlines -
+    see app migrations) shared by manager replicas and kept over restarts
+    """
+
+    # count the vote only if voter is new and voting is running,
+    # all in one statement - concurrent votes can't be lost or doubled
+    VOTE_QUERY = """
+        with voter as (
+            insert into voting_voters (chat_id, user_id)
+            select chat_id, $2 from votings
+            where chat_id = $1 and expires_at > now()
+            on conflict do nothing
+            returning chat_id
+        ), counted as (
+            update votings set counter = counter + $3
+            where chat_id in (select chat_id from voter)
+            returning chat_id
+        )
+        select
+            exists(select 1 from counted) as counted,
+            exists(
+                select 1 from votings
+                where chat_id = $1 and expires_at > now()
+            ) as active
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def start(self):
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.dsn, min_size=self.min_size, max_size=self.max_size
+        )
+        # votings of rounds which were not saved - nobody counts them
+        await self.pool.execute(
+            "delete from votings where chat_id not in "
+            "(select chat_id from game_rounds)"
+        )
+
+    async def stop(self):
+        if self.pool:
+            await self.pool.close()
+
+    async def start_voting(self, chat_id: int, timeout: float):
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(
+                    "delete from voting_voters where chat_id = $1", chat_id
+                )
+                await connection.execute(
+                    "insert into votings (chat_id, counter, expires_at) "
+                    "values ($1, 0, now() + make_interval(secs => $2)) "
+                    "on conflict (chat_id) do update "
+                    "set counter = 0, expires_at = excluded.expires_at",
+                    chat_id,
+                    float(timeout + VOTING_GRACE),
+                )
+
+    async def is_voting(self, chat_id: int) -> bool:
+        return bool(
+            await self.pool.fetchval(
+                "select 1 from votings where chat_id = $1 and expires_at > now()",
+                chat_id,
+            )
+        )
+
+    async def vote(
+        self, chat_id: int, user_id: int, delta: int
+    ) -> Optional[bool]:
+        row = await self.pool.fetchrow(self.VOTE_QUERY, chat_id, user_id, delta)
+        if row["counted"]:
+            return True
+        return False if row["active"] else None
+
+    async def finish_voting(self, chat_id: int) -> int:
+        # voters are removed by cascade
+        counter = await self.pool.fetchval(
+            "delete from votings where chat_id = $1 returning counter", chat_id
+        )
+        return counter or 0
+
+    async def set_last_inline(self, chat_id: int, message_id: int):
+        await self.pool.execute(
+            "insert into last_inlines (chat_id, message_id) values ($1, $2) "
+            "on conflict (chat_id) do update set message_id = excluded.message_id",
+            chat_id,
+            message_id,
+        )
+
+    async def pop_last_inline(self, chat_id: int) -> Optional[int]:
+        return await self.pool.fetchval(
+            "delete from last_inlines where chat_id = $1 returning message_id",
+            chat_id,
+        )
+
+    async def save_round(self, chat_id: int, game_round: dict):
+        await self.pool.execute(
+            "insert into game_rounds (chat_id, data, updated_at) "
+            "values ($1, $2, now()) "
+            "on conflict (chat_id) do update "
+            "set data = excluded.data, updated_at = excluded.updated_at",
+            chat_id,
+            json.dumps(game_round),
+        )
+
+    async def delete_round(self, chat_id: int):
+        await self.pool.execute(
+            "delete from game_rounds where chat_id = $1", chat_id
+        )
+
+    async def load_rounds(self) -> list[dict]:
+        rows = await self.pool.fetch("select data from game_rounds")
+        return [json.loads(row["data"]) for row in rows]
+
+
+def setup_state() -> StateBackend:
+    """
+    MANAGER_STATE=memory (default, single manager) or postgres
+    """
+    if os.environ.get("MANAGER_STATE", "memory") == "postgres":
+        return PostgresState(
+            dsn=os.environ.get(
+                "MANAGER_STATE_DSN", "postgresql://kts_user:kts_pass@db/kts"
+            )
+        )
+    return InMemoryState()
@@ -0,0 +1,111 @@
+import asyncio
+
+import poller
+import wire
+
+
+def make_update(update_id, chat_id=-1001):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": {"id": 10, "username": "player"},
+            "chat": {"id": chat_id},
+            "text": "/start",
+        },
+    }
+
+
+class SlowExchange:
+    """
+    confirms n-th publish after n * delay seconds,
+    fails publishes of update_ids in fail
+    """
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.count = 0
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.count += 1
+        await asyncio.sleep(self.count * self.delay)
+        update_id = wire.loads(message.body, message.content_type)[0]
+        if update_id in self.fail:
+            raise ConnectionError("not confirmed")
+        self.published.append(update_id)
+
+
+class FakeChannel:
+    def __init__(self, exchange):
+        self.default_exchange = exchange
+
+
+def make_poller(monkeypatch, tmp_path, exchange):
+    monkeypatch.setattr(poller, "OFFSET_FILE", str(tmp_path / "offset"))
+    fake_poller = poller.Poller()
+    fake_poller.channel = FakeChannel(exchange)
+    return fake_poller
+
+
+def saved_offset(tmp_path):
+    return int((tmp_path / "offset").read_text())
+
+
+def test_cancel_saves_confirmed_prefix(monkeypatch, tmp_path):
+    async def run():
+        fake_poller = make_poller(monkeypatch, tmp_path, SlowExchange(0.05))
+        batch = asyncio.create_task(
+            fake_poller.publish_batch([make_update(i) for i in range(1, 6)])
+        )
+        await asyncio.sleep(0.12)  # updates 1 and 2 are confirmed
+        batch.cancel()
+        await asyncio.gather(batch, return_exceptions=True)
+        return fake_poller
+
+    fake_poller = asyncio.run(run())
+    assert fake_poller.offset == 3
+    assert saved_offset(tmp_path) == 3
+
+
+def test_poll_retries_after_get_updates_error(monkeypatch, tmp_path):
+    async def run():
+        fake_poller = make_poller(monkeypatch, tmp_path, SlowExchange())
+        answers = [ValueError("not json"), [make_update(7)]]
+
+        async def get_updates():
+            if not answers:
+                await asyncio.Event().wait()  # long poll with no updates
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        fake_poller.get_updates = get_updates
+        poll = asyncio.create_task(fake_poller.poll())
+        for _ in range(100):  # retry is after 1 second
+            if fake_poller.offset is not None:
+                break
+            await asyncio.sleep(0.05)
+        poll.cancel()
+        await poll
+        return fake_poller
+
+    fake_poller = asyncio.run(run())
+    assert fake_poller.offset == 8
+    assert saved_offset(tmp_path) == 8
+
+
+def test_offset_stops_before_failed_publish(monkeypatch, tmp_path):
+    async def run():
+        exchange = SlowExchange(fail={3})
+        fake_poller = make_poller(monkeypatch, tmp_path, exchange)
+        await fake_poller.publish_batch([make_update(i) for i in range(1, 6)])
+        return fake_poller, exchange
+
+    fake_poller, exchange = asyncio.run(run())
+    # whole batch was sent, 4 and 5 will be asked again with 3
+    assert sorted(exchange.published) == [1, 2, 4, 5]
+    assert fake_poller.offset == 3
+    assert saved_offset(tmp_path) == 3
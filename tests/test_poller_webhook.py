@@ -0,0 +1,85 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import poller
+import wire
+
+SECRET = "test-secret"
+
+UPDATE = {
+    "update_id": 100,
+    "message": {
+        "message_id": 1,
+        "from": {"id": 10, "username": "player"},
+        "chat": {"id": -1001},
+        "text": "/start",
+    },
+}
+
+
+class FakeExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((message, routing_key))
+
+
+class FakeChannel:
+    def __init__(self):
+        self.default_exchange = FakeExchange()
+
+
+def post_update(update, secret, depth=0):
+    """
+    POST update to webhook of a poller with fake channel,
+    return response status and published messages
+    """
+
+    async def run():
+        fake_poller = poller.Poller()
+        fake_poller.channel = FakeChannel()
+        fake_poller.depth = depth
+        async with TestClient(TestServer(fake_poller.webhook_app())) as client:
+            response = await client.post(
+                poller.WEBHOOK_PATH,
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+            )
+        return response.status, fake_poller.channel.default_exchange.published
+
+    return asyncio.run(run())
+
+
+def test_update_is_published(monkeypatch):
+    monkeypatch.setattr(poller, "WEBHOOK_SECRET", SECRET)
+    status, published = post_update(UPDATE, SECRET)
+    assert status == 200
+    [(message, routing_key)] = published
+    assert routing_key == poller.queue_name(poller.shard_of(-1001))
+    update = wire.unpack_update(wire.loads(message.body, message.content_type))
+    assert update == wire.extract_update(UPDATE)
+
+
+def test_wrong_secret(monkeypatch):
+    monkeypatch.setattr(poller, "WEBHOOK_SECRET", SECRET)
+    status, published = post_update(UPDATE, "wrong")
+    assert status == 401
+    assert published == []
+
+
+def test_non_ascii_secret(monkeypatch):
+    monkeypatch.setattr(poller, "WEBHOOK_SECRET", SECRET)
+    status, published = post_update(UPDATE, "секрет")
+    assert status == 401
+    assert published == []
+
+
+def test_deep_queue(monkeypatch):
+    monkeypatch.setattr(poller, "WEBHOOK_SECRET", SECRET)
+    status, published = post_update(
+        UPDATE, SECRET, depth=poller.QUEUE_HIGH_LIMIT
+    )
+    assert status == 503
+    assert published == []
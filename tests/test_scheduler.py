@@ -0,0 +1,32 @@
+import asyncio
+
+from scheduler import Scheduler
+
+
+def test_stop_cancels_timers_and_running_callbacks():
+    async def run():
+        scheduler = Scheduler()
+        fired = []
+        started = asyncio.Event()
+
+        async def phase(name):
+            fired.append(name)
+            started.set()
+            await asyncio.sleep(10)
+            fired.append("after " + name)
+
+        scheduler.call_later(0, phase, "battle", key=("battle", 1))
+        scheduler.call_later(0.05, phase, "voting", key=("voting", 1))
+        await started.wait()
+        await scheduler.stop()
+        await asyncio.sleep(0.1)  # voting deadline passes
+        return scheduler, fired
+
+    scheduler, fired = asyncio.run(run())
+    assert fired == ["battle"]
+    assert scheduler.stats() == {
+        "pending": 0,
+        "fired": 1,
+        "keyed": 0,
+        "running": 0,
+    }
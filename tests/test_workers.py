@@ -0,0 +1,79 @@
+import asyncio
+
+from workers import ChatWorkers
+
+
+def run_workers(scenario, **kwargs):
+    """
+    run scenario(workers) with a handler recording (chat_id, item)
+    """
+
+    async def run():
+        handled = []
+
+        async def handler(chat_id, item):
+            handled.append((chat_id, item))
+
+        workers = ChatWorkers(handler, **kwargs)
+        await scenario(workers)
+        await workers.stop()
+        return handled
+
+    return asyncio.run(run())
+
+
+def test_chat_waits_for_idle_worker():
+    async def scenario(workers):
+        assert workers.submit(1, "a")
+        await asyncio.sleep(0.01)  # worker of chat 1 is idle now
+        assert workers.submit(2, "x")  # waits, idle worker is released
+        await asyncio.sleep(0.01)
+        assert list(workers.workers) == [2]
+
+    handled = run_workers(scenario, max_workers=1, mailbox_size=2)
+    assert handled == [(1, "a"), (2, "x")]
+
+
+def test_release_idle_worker_with_full_mailbox():
+    async def scenario(workers):
+        workers.submit(1, "a")
+        await asyncio.sleep(0.01)  # worker of chat 1 is idle
+        # mailbox is filled before the worker wakes up
+        assert workers.submit(1, "b")
+        assert workers.submit(1, "c")
+        assert workers.submit(2, "x")
+        await asyncio.sleep(0.01)
+
+    handled = run_workers(scenario, max_workers=1, mailbox_size=2)
+    assert handled == [(1, "a"), (1, "b"), (1, "c"), (2, "x")]
+
+
+def test_full_mailbox_rejects():
+    async def scenario(workers):
+        assert workers.submit(1, "a")
+        assert workers.submit(1, "b")
+        assert not workers.submit(1, "c")
+        await asyncio.sleep(0.01)
+        assert workers.stats()["rejected"] == 1
+
+    handled = run_workers(scenario, max_workers=1, mailbox_size=2)
+    assert handled == [(1, "a"), (1, "b")]
+
+
+def test_stop_drains_mailboxes():
+    async def run():
+        handled = []
+
+        async def handler(chat_id, item):
+            await asyncio.sleep(0.01)
+            handled.append((chat_id, item))
+
+        workers = ChatWorkers(handler, max_workers=1, mailbox_size=2)
+        for chat_id, item in ((1, "a"), (1, "b"), (2, "x")):
+            assert workers.submit(chat_id, item)
+        await workers.stop(timeout=1)
+        return handled, workers
+
+    handled, workers = asyncio.run(run())
+    assert handled == [(1, "a"), (1, "b"), (2, "x")]
+    assert not workers.workers and not workers.mailboxes
@@ -0,0 +1,152 @@
+import json
+import os
+from typing import Any, Optional
+
+import aio_pika
+import msgpack
+
+from dataclassess import Update, UpdateObject, Player
+
+# body encoding of messages between poller, manager and sender,
+# receiver decodes by content_type, so both can be mixed during rollout
+MSGPACK = "application/msgpack"
+JSON = "application/json"
+CONTENT_TYPE = JSON if os.environ.get("WIRE_FORMAT") == "json" else MSGPACK
+# layout of packed update below, bumped on any change of it
+SCHEMA_HEADER = "x-schema-version"
+SCHEMA_VERSION = 1
+
+
+def dumps(payload: Any, content_type: str = CONTENT_TYPE) -> bytes:
+    if content_type == MSGPACK:
+        return msgpack.packb(payload)
+    return json.dumps(payload).encode()
+
+
+def loads(body: bytes, content_type: Optional[str]) -> Any:
+    """
+    no content_type - json of services started before this format
+    """
+    if content_type == MSGPACK:
+        return msgpack.unpackb(body)
+    return json.loads(body.decode())
+
+
+def to_message(payload: Any, **kwargs) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=dumps(payload),
+        content_type=CONTENT_TYPE,
+        headers={SCHEMA_HEADER: SCHEMA_VERSION},
+        **kwargs,
+    )
+
+
+def from_message(message: aio_pika.IncomingMessage) -> Any:
+    return loads(message.body, message.content_type)
+
+
+def extract_update(update: dict) -> Optional[Update]:
+    """
+    raw telegram update -> Update, None for updates bot doesn't handle
+    """
+    try:
+        if "message" in update:
+            update_type = "message"
+            message = update["message"]
+            upd_obj = UpdateObject(
+                id=message["message_id"],
+                user=player_of(message["from"]),
+                chat_id=message["chat"]["id"],
+                text=message.get("text"),  # None for photo, sticker...
+            )
+
+        elif "callback_query" in update:
+            update_type = "callback_query"
+            callback_query = update["callback_query"]
+            upd_obj = UpdateObject(
+                id=callback_query["message"]["message_id"],
+                user=player_of(callback_query["from"]),
+                chat_id=callback_query["message"]["chat"]["id"],
+                text=callback_query["message"].get("text"),
+                data=callback_query.get("data"),
+                callback_query_id=callback_query["id"],
+            )
+        else:
+            return None
+    except KeyError:  # no chat or sender - nothing bot can answer
+        return None
+    return Update(id=update["update_id"], type=update_type, object=upd_obj)
+
+
+def player_of(user: dict) -> Player:
+    """
+    username is optional in telegram, players are named by first_name then
+    """
+    return Player(
+        id=user["id"], username=user.get("username") or user.get("first_name")
+    )
+
+
+def pack_update(update: Update) -> list:
+    """
+    schema 1: [id, type, message_id, user_id, username, chat_id, text,
+    data, callback_query_id] - positions instead of field names
+    """
+    obj = update.object
+    return [
+        update.id,
+        update.type,
+        obj.id,
+        obj.user.id,
+        obj.user.username,
+        obj.chat_id,
+        obj.text,
+        obj.data,
+        obj.callback_query_id,
+    ]
+
+
+def unpack_update(fields: list) -> Update:
+    (
+        update_id,
+        update_type,
+        message_id,
+        user_id,
+        username,
+        chat_id,
+        text,
+        data,
+        callback_query_id,
+    ) = fields
+    return Update(
+        id=update_id,
+        type=update_type,
+        object=UpdateObject(
+            id=message_id,
+            user=Player(id=user_id, username=username),
+            chat_id=chat_id,
+            text=text,
+            data=data,
+            callback_query_id=callback_query_id,
+        ),
+    )
+
+
+def update_message(update: Update) -> aio_pika.Message:
+    return to_message(
+        pack_update(update), delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+    )
+
+
+def decode_update(message: aio_pika.IncomingMessage) -> Optional[Update]:
+    """
+    packed update, or raw telegram update from a not yet updated poller
+    """
+    payload = from_message(message)
+    if isinstance(payload, dict):
+        return extract_update(payload)
+    version = (message.headers or {}).get(SCHEMA_HEADER)
+    if version != SCHEMA_VERSION:
+        print("Unknown update schema version", version)
+        return None
+    return unpack_update(payload)
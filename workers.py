@@ -0,0 +1,151 @@
+import asyncio
+from asyncio import Task
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+
+class ChatWorkers:
+    """
+    actor per chat: updates of one chat are handled one by one, in order,
+    by the chat worker; different chats are handled concurrently
+    - mailbox of a chat is bounded, submit() returns False when it is full
+    - at most max_workers workers live at once, other chats wait in line
+    - worker of an idle chat exits after idle_timeout, or at once
+      if some chat is waiting for a free worker
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[int, Any], Awaitable[Any]],
+        max_workers: int = 1000,
+        mailbox_size: int = 20,
+        idle_timeout: float = 60,
+    ):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.mailbox_size = mailbox_size
+        self.idle_timeout = idle_timeout
+        self.mailboxes: dict[int, asyncio.Queue] = {}
+        self.workers: dict[int, Task] = {}
+        self.idle: set[int] = set()  # workers waiting for mail
+        self.waiting: deque[int] = deque()  # chats with mail, no worker
+        self.rejected = 0
+        self.draining = False  # stop(): workers exit when mailbox is empty
+        self.stopped = False
+
+    def submit(self, chat_id: int, item: Any) -> bool:
+        if chat_id not in self.mailboxes:
+            self.mailboxes[chat_id] = asyncio.Queue(maxsize=self.mailbox_size)
+        mailbox = self.mailboxes[chat_id]
+        if mailbox.full():
+            self.rejected += 1
+            return False
+        mailbox.put_nowait(item)
+
+        if chat_id not in self.workers and chat_id not in self.waiting:
+            if len(self.workers) < self.max_workers:
+                self.start_worker(chat_id)
+            else:
+                self.waiting.append(chat_id)
+                self.release_idle()
+        return True
+
+    def start_worker(self, chat_id: int):
+        self.workers[chat_id] = asyncio.create_task(self.run(chat_id))
+
+    def release_idle(self):
+        """
+        ask one idle worker to exit and give its place to a waiting chat
+        idle worker with mail (not woken yet) exits by itself after it
+        """
+        for chat_id in self.idle:
+            mailbox = self.mailboxes[chat_id]
+            if mailbox.empty():  # room for None, mailbox may be full
+                self.idle.discard(chat_id)
+                mailbox.put_nowait(None)
+                return None
+
+    async def run(self, chat_id: int):
+        mailbox = self.mailboxes[chat_id]
+        try:
+            while True:
+                if mailbox.empty() and (self.waiting or self.draining):
+                    break
+                self.idle.add(chat_id)
+                try:
+                    item = await asyncio.wait_for(
+                        mailbox.get(), self.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    break
+                finally:
+                    self.idle.discard(chat_id)
+                if item is None:  # released for a waiting chat
+                    continue
+                try:
+                    await self.handler(chat_id, item)
+                except Exception as e:  # update is lost, go on with mailbox
+                    print("Failed to handle update", chat_id, repr(e))
+        finally:
+            self.workers.pop(chat_id, None)
+            if mailbox.empty() or self.stopped:
+                self.mailboxes.pop(chat_id, None)
+            else:  # cancelled with mail left - back in line
+                self.waiting.append(chat_id)
+            if not self.stopped:
+                self.start_waiting()
+
+    def start_waiting(self):
+        while self.waiting and len(self.workers) < self.max_workers:
+            chat_id = self.waiting.popleft()
+            if chat_id in self.mailboxes and chat_id not in self.workers:
+                self.start_worker(chat_id)
+
+    def depth(self, chat_id: int) -> int:
+        mailbox = self.mailboxes.get(chat_id)
+        return mailbox.qsize() if mailbox else 0
+
+    def stats(self, top: int = 5) -> dict:
+        depths = sorted(
+            (
+                (mailbox.qsize(), chat_id)
+                for chat_id, mailbox in self.mailboxes.items()
+            ),
+            reverse=True,
+        )
+        return {
+            "workers": len(self.workers),
+            "idle": len(self.idle),
+            "waiting": len(self.waiting),
+            "queued": sum(depth for depth, _ in depths),
+            "rejected": self.rejected,
+            "deepest": {chat_id: depth for depth, chat_id in depths[:top]},
+        }
+
+    async def stop(self, timeout: float = 10):
+        """
+        updates in mailboxes are acked already - handle them first,
+        workers still busy after timeout are cancelled
+        """
+        self.draining = True
+        for chat_id in list(self.idle):  # wake up to exit
+            if self.mailboxes[chat_id].empty():
+                self.idle.discard(chat_id)
+                self.mailboxes[chat_id].put_nowait(None)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.workers and loop.time() < deadline:
+            await asyncio.wait(
+                list(self.workers.values()), timeout=deadline - loop.time()
+            )
+
+        self.stopped = True
+        self.waiting.clear()
+        lost = sum(mailbox.qsize() for mailbox in self.mailboxes.values())
+        if lost:
+            print("Chat workers stopped, updates not handled:", lost)
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)